@@ -17,10 +17,226 @@ You should have received a copy of the GNU General Public License
 along with python-lightblueclient.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import asyncio
+import atexit
+import collections
+import concurrent.futures
+import functools
+import gzip
+import hashlib
+import http.client
+import io
 import json
-import httplib
+import select
+import socket
 import ssl
-from urlparse import urlparse
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(value):
+        return json.dumps(value).encode('utf-8')
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Idle connections shared by all DataConnection instances, keyed by
+# (hostname, port, cert_file, ssl_context), least recently used first.
+_POOL = collections.OrderedDict()
+_POOL_MAXSIZE = 32
+_POOL_MAXKEYS = 16
+_POOL_LOCK = threading.Lock()
+
+# HTTP/2 clients shared by all Http2DataConnection instances, keyed like
+# _POOL.
+_HTTP2_CLIENTS = {}
+
+# Resolved addresses by (host, port), with the time they expire.
+_DNS_CACHE = {}
+_DNS_LOCK = threading.Lock()
+
+
+def _is_connection_dropped(connection):
+    # An idle keep-alive socket should have nothing to read; if it does, the
+    # server has closed it (or sent something we cannot use).
+    if connection.sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([connection.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+def _acquire_connection(key):
+    while True:
+        with _POOL_LOCK:
+            idle = _POOL.get(key)
+            if not idle:
+                return None
+            connection = idle.pop()
+        if not _is_connection_dropped(connection):
+            return connection
+        connection.close()
+
+
+def _release_connection(key, connection):
+    evicted = []
+    with _POOL_LOCK:
+        if key not in _POOL and len(_POOL) >= _POOL_MAXKEYS:
+            evicted = _POOL.popitem(last=False)[1]
+        idle = _POOL.setdefault(key, [])
+        _POOL.move_to_end(key)
+        if len(idle) < _POOL_MAXSIZE:
+            idle.append(connection)
+        else:
+            evicted.append(connection)
+    for connection in evicted:
+        connection.close()
+
+
+@atexit.register
+def _close_pool():
+    with _POOL_LOCK:
+        for idle in _POOL.values():
+            for connection in idle:
+                connection.close()
+        _POOL.clear()
+        for client in _HTTP2_CLIENTS.values():
+            client.close()
+        _HTTP2_CLIENTS.clear()
+
+
+def _resolve(host, port, ttl):
+    now = time.monotonic()
+    with _DNS_LOCK:
+        entry = _DNS_CACHE.get((host, port))
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    with _DNS_LOCK:
+        _DNS_CACHE[(host, port)] = (now + ttl, addresses)
+    return addresses
+
+
+def _create_connection(ttl, address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+                       source_address=None):
+    host, port = address
+    error = None
+    for _, _, _, _, sockaddr in _resolve(host, port, ttl):
+        try:
+            return socket.create_connection((sockaddr[0], port), timeout,
+                                            source_address)
+        except OSError as e:
+            error = e
+    raise error
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+
+    def __init__(self, host, port=None, dns_ttl=None, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.set_dns_ttl(dns_ttl)
+
+    def set_dns_ttl(self, dns_ttl):
+        if dns_ttl:
+            self._create_connection = functools.partial(_create_connection,
+                                                        dns_ttl)
+        else:
+            self._create_connection = socket.create_connection
+
+    def connect(self):
+        super().connect()
+        # Small JSON requests must not wait on Nagle's algorithm; keep-alive
+        # probes let idle pooled sockets notice dead peers.
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+
+@functools.lru_cache(maxsize=None)
+def _default_ssl_context(cert_file, verify):
+    if verify:
+        context = ssl.create_default_context()
+    else:
+        context = ssl._create_unverified_context()
+    if cert_file:
+        context.load_cert_chain(cert_file)
+    return context
+
+
+def _is_struct(value):
+    return msgspec is not None and isinstance(value, msgspec.Struct)
+
+
+def _encode(request):
+    if type(request) is str:
+        return request.encode('utf-8')
+    if _is_struct(request):
+        return msgspec.json.encode(request)
+    return _dumps(request)
+
+
+def _decode(data, response_type):
+    if response_type is None:
+        return _loads(data)
+    if msgspec is None:
+        raise ImportError('response_type requires msgspec')
+    return msgspec.json.decode(data, type=response_type)
+
+
+def _convert(value, response_type):
+    # Like _decode, for responses already decoded as part of a bulk request.
+    if response_type is None:
+        return value
+    if msgspec is None:
+        raise ImportError('response_type requires msgspec')
+    return msgspec.convert(value, type=response_type)
+
+
+def _build_find_body(projection, query, range_, sort):
+    fields = ((b'"projection":', projection),
+              (b'"query":', query),
+              (b'"range":', range_),
+              (b'"sort":', sort))
+    body = bytearray(b'{')
+    for name, value in fields:
+        if value:
+            if len(body) > 1:
+                body += b','
+            body += name
+            body += _dumps(value)
+    body += b'}'
+    return bytes(body)
+
+
+def _items(value, keys):
+    # Mimics ijson.items on an already decoded document.
+    if not keys:
+        yield value
+    elif keys[0] == 'item':
+        for element in value:
+            yield from _items(element, keys[1:])
+    elif keys[0] in value:
+        yield from _items(value[keys[0]], keys[1:])
 
 
 class DataConnection:
@@ -29,56 +245,198 @@ class DataConnection:
     Can be used with the `with` statement.
     """
 
-    def __init__(self, url, cert_file=None, ssl_context=None):
+    _HEADERS = {'Accept-Encoding': 'gzip', 'Connection': 'keep-alive'}
+    _JSON_HEADERS = dict(_HEADERS, **{'Content-Type': 'application/json'})
+
+    def __init__(self, url, cert_file=None, ssl_context=None, cache_ttl=None,
+                 cache_size=256, verify=True, dns_ttl=None):
         """Open a connection to a lightblue data service.
 
         Parameters
         ----------
         url : url for the data endpoint
-        cert_file : file to be used for client cert auth, optional
+        cert_file : file to be used for client cert auth when no
+            ssl_context is given, optional; with your own ssl_context,
+            call its load_cert_chain instead
         ssl_context : SSL context to be used for SSL/TLS, optional
+        cache_ttl : seconds to cache find responses for, optional
+        cache_size : maximum number of cached find responses, optional
+        verify : whether to verify the server certificate when no
+            ssl_context is given, optional
+        dns_ttl : seconds to cache host name lookups for, optional
 
         """
+        self.dns_ttl = dns_ttl
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Connection with a response being streamed by find_iter, if any.
+        self._streaming = None
         parsed_url = urlparse(url)
         hostname = parsed_url.hostname
         port = parsed_url.port or 443
-        self.path = parsed_url.path
-        if self.path.endswith('/'):
-            self.path = self.path[:-1]
+        self.path = parsed_url.path.rstrip('/')
+        self._find_prefix = self.path + '/find/'
+        self._insert_prefix = self.path + '/insert/'
+        self._bulk_path = self.path + '/bulk'
         if not ssl_context:
-            try:
-                ssl_context = ssl._create_unverified_context()
-            except AttributeError:
-                pass
-        if ssl_context:
-            self.connection = httplib.HTTPSConnection(hostname, port,
-                                                      cert_file=cert_file,
-                                                      context=ssl_context)
+            ssl_context = _default_ssl_context(cert_file, verify)
+        self._pool_key = (hostname, port, cert_file, ssl_context)
+        self._open_args = (hostname, port, ssl_context)
+        self._open(*self._open_args)
+
+    def _open(self, hostname, port, ssl_context):
+        self.connection = _acquire_connection(self._pool_key)
+        if self.connection is None:
+            self.connection = _HTTPSConnection(hostname, port,
+                                               dns_ttl=self.dns_ttl,
+                                               context=ssl_context)
         else:
-            self.connection = httplib.HTTPSConnection(hostname, port,
-                                                      cert_file=cert_file)
-
-    def _handle_response(self):
-        response = self.connection.getresponse()
-        data = response.read()
-        if response.status == httplib.OK:
-            return json.loads(data)
+            # The pooled connection may have been made with another dns_ttl.
+            self.connection.set_dns_ttl(self.dns_ttl)
+
+    def _request(self, method, path, body=None, headers=None,
+                 idempotent=False):
+        response = self._send(method, path, body, headers, idempotent)
+        return self._handle_response(response)
+
+    def _send(self, method, path, body=None, headers=None, idempotent=False):
+        if headers is None:
+            headers = self._HEADERS
+        if self.connection is None:
+            # Used again after close(); take a connection as __init__ does.
+            self._open(*self._open_args)
+        reused = self.connection.sock is not None
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        except (http.client.BadStatusLine, OSError) as e:
+            # The server may have dropped an idle keep-alive connection;
+            # retry once on a fresh socket, unless the server could already
+            # have applied a write.
+            self.connection.close()
+            if not (reused and idempotent) or isinstance(e, socket.timeout):
+                raise
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        return response
+
+    def _handle_response(self, response):
+        return _loads(self._read_response(response))
+
+    def _read_response(self, response):
+        try:
+            data = response.read()
+            if response.getheader('Content-Encoding') == 'gzip':
+                data = gzip.decompress(data)
+        except Exception:
+            # Never leave a partly read response on a connection that may go
+            # back to the pool.
+            if self.connection is not None:
+                self.connection.close()
+            raise
+        if response.status == http.client.OK:
+            return data
         else:
-            message = 'HTTP code: {0}; body {1}'.format(response.status, data)
+            message = 'HTTP code: {0}; body {1}'.format(
+                response.status, data.decode('utf-8', 'replace'))
             raise RuntimeError(message)
 
     def close(self):
-        """Close the connection."""
-        self.connection.close()
+        """Close the connection.
+
+        The underlying socket is kept open and returned to a shared pool so
+        that later connections to the same service can reuse it. Using the
+        connection again after closing it takes a new socket.
+        """
+        if self.connection is None:
+            return
+        if self._streaming is self.connection:
+            # A find_iter response is still being read; the socket cannot be
+            # reused.
+            self.connection.close()
+            self._streaming = None
+        else:
+            _release_connection(self._pool_key, self.connection)
+        self.connection = None
 
     def find(self, entity, version, projection=None, query=None, range=None,
-             sort=None, request={}):
+             sort=None, request=None, response_type=None):
         """Do a find request for a particular version of an entity.
 
         You can either construct the request as a dict or str, or pass parts
         of the request, or no request in order to fetch all instances of the
         entity.
 
+        With msgspec installed, the request may also be a `msgspec.Struct`,
+        and passing a Struct subclass as `response_type` decodes the
+        response straight into it instead of into dicts, e.g.::
+
+            class Row(msgspec.Struct):
+                _id: str
+
+            class Response(msgspec.Struct):
+                processed: list[Row]
+
+        Parameters
+        ----------
+        entity : name of the entity
+        version : version of the entity
+        projection : dict, optional
+        query : dict, optional
+        range : list, optional
+        sort : dict, optional
+        request : dict, string or msgspec.Struct, optional
+        response_type : type to decode the response into, optional
+        """
+        method, path, body, headers = self._find_request(
+            entity, version, projection, query, range, sort, request)
+        if not self.cache_ttl:
+            response = self._send(method, path, body, headers, True)
+            return _decode(self._read_response(response), response_type)
+        key = self._cache_key(method, path, body)
+        data = self._cache_get(key)
+        if data is not None:
+            return _decode(data, response_type)
+        response = self._send(method, path, body, headers, True)
+        data = self._read_response(response)
+        if 'no-store' not in (response.getheader('Cache-Control') or ''):
+            self._cache_put(key, data)
+        return _decode(data, response_type)
+
+    def _cache_key(self, method, path, body):
+        digest = hashlib.blake2b(body or b'', digest_size=16).digest()
+        return method, path, digest
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                return entry[1]
+        return None
+
+    def _cache_put(self, key, data):
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, data)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_clear(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def find_iter(self, entity, version, projection=None, query=None,
+                  range=None, sort=None, request=None,
+                  prefix='processed.item'):
+        """Do a find request and iterate over the matching entities.
+
+        The response is parsed incrementally with ijson as it arrives, so
+        large result sets are never held in memory at once. Without ijson
+        installed, the response is decoded in full before iterating.
+
         Parameters
         ----------
         entity : name of the entity
@@ -88,8 +446,66 @@ class DataConnection:
         range : list, optional
         sort : dict, optional
         request : dict or string, optional
+        prefix : ijson prefix of the items to yield, optional
         """
-        path = '{0}/find/{1}/{2}'.format(self.path, entity, version)
+        response = self._send(*self._find_request(entity, version, projection,
+                                                  query, range, sort, request),
+                              idempotent=True)
+        if response.status != http.client.OK or ijson is None:
+            document = self._handle_response(response)
+            yield from _items(document, prefix.split('.'))
+            return
+        connection = self._streaming = self.connection
+        exhausted = False
+        try:
+            if response.getheader('Content-Encoding') == 'gzip':
+                response = gzip.GzipFile(fileobj=response)
+            yield from ijson.items(response, prefix, use_float=True)
+            exhausted = True
+        finally:
+            if self._streaming is connection:
+                self._streaming = None
+            if not exhausted and connection is not None:
+                # Unread body would corrupt the next response on this socket.
+                connection.close()
+
+    def bind(self, entity, version, projection=None, sort=None):
+        """Prepare a find request for repeated queries on one entity.
+
+        The path and the constant parts of the request are serialized once;
+        the returned function only serializes the query on each call.
+
+        Parameters
+        ----------
+        entity : name of the entity
+        version : version of the entity
+        projection : dict, optional
+        sort : dict, optional
+
+        Returns
+        -------
+        function taking a query dict and returning the find response
+        """
+        path = self._find_prefix + entity + '/' + str(version)
+        prefix = _build_find_body(projection, None, None, sort)[:-1]
+        prefix += b',"query":' if len(prefix) > 1 else b'"query":'
+        headers = self._JSON_HEADERS
+
+        def find(query):
+            return self._request('POST', path, prefix + _dumps(query) + b'}',
+                                 headers, idempotent=True)
+        return find
+
+    def _find_request(self, entity, version, projection, query, range, sort,
+                      request):
+        if request is None:
+            request = {}
+        elif type(request) is not str and not _is_struct(request):
+            request = dict(request)
+        path = self._find_prefix + entity + '/' + str(version)
+        if not request and (projection or query or range or sort):
+            body = _build_find_body(projection, query, range, sort)
+            return ('POST', path, body, self._JSON_HEADERS)
         if projection:
             request['projection'] = projection
         if query:
@@ -99,19 +515,16 @@ class DataConnection:
         if sort:
             request['sort'] = sort
         if request:
-            if type(request) is not str:
-                request = json.dumps(request)
-            headers = {'Content-Type': 'application/json'}
-            self.connection.request('POST', path, request, headers)
-        else:
-            self.connection.request('GET', path)
-        return self._handle_response()
+            request = _encode(request)
+            return ('POST', path, request, self._JSON_HEADERS)
+        return ('GET', path, None, self._HEADERS)
 
-    def insert(self, entity, version, data=None, projection=None, request={}):
+    def insert(self, entity, version, data=None, projection=None,
+               request=None):
         """Do an insert request for a particular version of an entity.
 
-        You can either construct the request as a dict or str, or pass parts
-        of the request.
+        You can either construct the request as a dict, str or
+        msgspec.Struct, or pass parts of the request.
 
         Parameters
         ----------
@@ -120,23 +533,470 @@ class DataConnection:
         data: dict, optional
         projection : dict, optional
         sort : dict, optional
-        request : dict or string, optional
+        request : dict, string or msgspec.Struct, optional
         """
-        if data is None and len(request) == 0:
+        if request is None:
+            request = {}
+        elif type(request) is not str and not _is_struct(request):
+            request = dict(request)
+        if data is None and not _is_struct(request) and len(request) == 0:
             raise RuntimeError('Must provide data or request')
-        path = '{0}/insert/{1}/{2}'.format(self.path, entity, version)
+        self._cache_clear()
+        path = self._insert_prefix + entity + '/' + str(version)
         if data:
             request['data'] = data
         if projection:
             request['projection'] = projection
-        if type(request) is not str:
-            request = json.dumps(request)
-        headers = {'Content-Type': 'application/json'}
-        self.connection.request('PUT', path, request, headers)
-        return self._handle_response()
+        request = _encode(request)
+        return self._request('PUT', path, request, self._JSON_HEADERS)
+
+    def _bulk(self, op, calls, fields):
+        calls = list(calls)
+        requests = []
+        for seq, call in enumerate(calls):
+            request = call.get('request') or {}
+            if type(request) is str:
+                request = _loads(request)
+            elif _is_struct(request):
+                request = msgspec.to_builtins(request)
+            request = dict(request)
+            for field in fields:
+                if call.get(field):
+                    request[field] = call[field]
+            request['entity'] = call['entity']
+            request['entityVersion'] = call['version']
+            requests.append({'seq': seq, 'op': op, 'request': request})
+        body = _dumps({'requests': requests})
+        result = self._request('POST', self._bulk_path, body,
+                               self._JSON_HEADERS, idempotent=op == 'FIND')
+        responses = sorted(result['responses'], key=lambda r: r['seq'])
+        return [_convert(r['response'], call.get('response_type'))
+                for call, r in zip(calls, responses)]
+
+    def find_many(self, calls):
+        """Do several find requests in a single round trip.
+
+        The requests are sent together to the bulk endpoint of the data
+        service.
+
+        Parameters
+        ----------
+        calls : list of dict, each holding the keyword arguments of `find`
+
+        Returns
+        -------
+        list of responses, in the same order as `calls`
+        """
+        return self._bulk('FIND', calls,
+                          ('projection', 'query', 'range', 'sort'))
+
+    def insert_many(self, calls):
+        """Do several insert requests in a single round trip.
+
+        The requests are sent together to the bulk endpoint of the data
+        service.
+
+        Parameters
+        ----------
+        calls : list of dict, each holding the keyword arguments of `insert`
+
+        Returns
+        -------
+        list of responses, in the same order as `calls`
+        """
+        self._cache_clear()
+        return self._bulk('INSERT', calls, ('data', 'projection'))
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args):
         self.close()
+
+
+class _HTTPXResponse(io.BytesIO):
+    # Presents an httpx response through the parts of the
+    # http.client.HTTPResponse interface that DataConnection uses.
+
+    def __init__(self, response):
+        super().__init__(response.content)
+        self.status = response.status_code
+        self._headers = response.headers
+
+    def getheader(self, name, default=None):
+        if name.lower() == 'content-encoding':
+            # httpx has already decoded the body.
+            return default
+        return self._headers.get(name, default)
+
+
+class Http2DataConnection(DataConnection):
+    """A connection to a lightblue data service over HTTP/2.
+
+    Requests are multiplexed over a single connection per service, shared
+    by all instances, so a slow response does not hold up the others.
+    Requires httpx with HTTP/2 support (``pip install httpx[http2]``).
+    Can be used with the `with` statement.
+    """
+
+    # HTTP/2 forbids connection-specific headers; httpx negotiates
+    # compression itself.
+    _HEADERS = {}
+    _JSON_HEADERS = {'Content-Type': 'application/json'}
+
+    def _open(self, hostname, port, ssl_context):
+        if httpx is None:
+            raise ImportError('Http2DataConnection requires httpx[http2]')
+        self.connection = None
+        with _POOL_LOCK:
+            self._client = _HTTP2_CLIENTS.get(self._pool_key)
+            if self._client is None:
+                self._client = httpx.Client(
+                    base_url='https://{0}:{1}'.format(hostname, port),
+                    http2=True, verify=ssl_context,
+                    limits=httpx.Limits(max_keepalive_connections=8))
+                _HTTP2_CLIENTS[self._pool_key] = self._client
+
+    def _send(self, method, path, body=None, headers=None, idempotent=False):
+        if headers is None:
+            headers = self._HEADERS
+        if self._client is None:
+            self._open(*self._open_args)
+        response = self._client.request(method, path, content=body,
+                                        headers=headers)
+        return _HTTPXResponse(response)
+
+    def close(self):
+        """Close the connection.
+
+        The shared HTTP/2 connection stays open for other instances.
+        """
+        self._client = None
+
+
+class BatchingDataConnection(DataConnection):
+    """A connection that coalesces concurrent find requests.
+
+    Calls to `find` made from several threads within `window` seconds of
+    each other are sent to the data service as a single bulk request. All
+    other requests take turns on the connection, so an instance can be
+    shared between threads.
+    """
+
+    def __init__(self, url, cert_file=None, ssl_context=None, window=0.005,
+                 verify=True, **kwargs):
+        """Open a batching connection to a lightblue data service.
+
+        Parameters
+        ----------
+        url : url for the data endpoint
+        cert_file : file to be used for client cert auth when no
+            ssl_context is given, optional; with your own ssl_context,
+            call its load_cert_chain instead
+        ssl_context : SSL context to be used for SSL/TLS, optional
+        window : seconds to wait for more find requests, optional
+        verify : whether to verify the server certificate when no
+            ssl_context is given, optional
+        kwargs : further options of `DataConnection`, such as cache_ttl,
+            cache_size or dns_ttl, optional
+
+        """
+        super().__init__(url, cert_file=cert_file, ssl_context=ssl_context,
+                         verify=verify, **kwargs)
+        self.window = window
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _request(self, method, path, body=None, headers=None,
+                 idempotent=False):
+        with self._lock:
+            return super()._request(method, path, body, headers, idempotent)
+
+    def close(self):
+        """Close the connection."""
+        with self._lock:
+            super().close()
+
+    def find_iter(self, *args, **kwargs):
+        """Do a find request and iterate over the matching entities.
+
+        Unlike `DataConnection.find_iter`, the response is read in full
+        before iterating, so the connection is not held by the caller.
+        See `DataConnection.find_iter` for the parameters.
+        """
+        with self._lock:
+            items = list(super().find_iter(*args, **kwargs))
+        yield from items
+
+    def find(self, entity, version, projection=None, query=None, range=None,
+             sort=None, request=None, response_type=None):
+        """Do a find request, batched with other concurrent find requests.
+
+        See `DataConnection.find` for the parameters.
+        """
+        key = None
+        if self.cache_ttl:
+            method, path, body, _ = self._find_request(
+                entity, version, projection, query, range, sort, request)
+            key = self._cache_key(method, path, body)
+            data = self._cache_get(key)
+            if data is not None:
+                return _decode(data, response_type)
+        call = {'entity': entity, 'version': version,
+                'projection': projection, 'query': query, 'range': range,
+                'sort': sort, 'request': request}
+        slot = {'call': call, 'done': threading.Event()}
+        with self._pending_lock:
+            self._pending.append(slot)
+            if len(self._pending) == 1:
+                timer = threading.Timer(self.window, self._flush)
+                timer.daemon = True
+                timer.start()
+        slot['done'].wait()
+        if 'error' in slot:
+            raise slot['error']
+        if key is not None:
+            self._cache_put(key, _dumps(slot['result']))
+        return _convert(slot['result'], response_type)
+
+    def _flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        try:
+            results = self.find_many([slot['call'] for slot in pending])
+        except Exception as e:
+            for slot in pending:
+                slot['error'] = e
+        else:
+            for slot, result in zip(pending, results):
+                slot['result'] = result
+        for slot in pending:
+            slot['done'].set()
+
+
+class AsyncDataConnection:
+    """An asyncio connection to a lightblue data service.
+
+    Requests run on a pool of worker threads, each holding its own
+    `DataConnection`, so up to `max_concurrency` requests are in flight at
+    once. Can be used with the `async with` statement.
+    """
+
+    def __init__(self, url, cert_file=None, ssl_context=None,
+                 max_concurrency=8, verify=True, **kwargs):
+        """Open a connection to a lightblue data service.
+
+        Parameters
+        ----------
+        url : url for the data endpoint
+        cert_file : file to be used for client cert auth when no
+            ssl_context is given, optional; with your own ssl_context,
+            call its load_cert_chain instead
+        ssl_context : SSL context to be used for SSL/TLS, optional
+        max_concurrency : maximum number of requests in flight, optional
+        verify : whether to verify the server certificate when no
+            ssl_context is given, optional
+        kwargs : further options of `DataConnection`, such as cache_ttl,
+            cache_size or dns_ttl, optional
+
+        """
+        self._args = (url, cert_file, ssl_context)
+        self._kwargs = dict(kwargs, verify=verify)
+        # One response cache for all worker connections, so that an insert
+        # on any of them invalidates it for all.
+        self._cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_concurrency)
+
+    def _call(self, method, *args):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = DataConnection(*self._args, **self._kwargs)
+            connection._cache = self._cache
+            connection._cache_lock = self._cache_lock
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return getattr(connection, method)(*args)
+
+    async def _run(self, method, *args):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._call, method, *args)
+        return await loop.run_in_executor(self._executor, call)
+
+    def close(self):
+        """Close the connection, waiting for requests in flight."""
+        self._executor.shutdown()
+        for connection in self._connections:
+            connection.close()
+        self._connections = []
+
+    async def find(self, entity, version, projection=None, query=None,
+                   range=None, sort=None, request=None, response_type=None):
+        """Do a find request for a particular version of an entity.
+
+        See `DataConnection.find` for the parameters.
+        """
+        return await self._run('find', entity, version, projection, query,
+                               range, sort, request, response_type)
+
+    async def insert(self, entity, version, data=None, projection=None,
+                     request=None):
+        """Do an insert request for a particular version of an entity.
+
+        See `DataConnection.insert` for the parameters.
+        """
+        return await self._run('insert', entity, version, data, projection,
+                               request)
+
+    async def find_many(self, calls):
+        """Do several find requests concurrently.
+
+        Parameters
+        ----------
+        calls : list of dict, each holding the keyword arguments of `find`
+
+        Returns
+        -------
+        list of responses, in the same order as `calls`
+        """
+        return await asyncio.gather(*[self.find(**call) for call in calls])
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        # Waiting for requests in flight must not block the event loop.
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+class FindLoader:
+    """Coalesces finds of single entities by key into one find request.
+
+    Keys passed to `load` from several threads within `delay` seconds of
+    each other are fetched with a single ``$in`` query. Each returned
+    future resolves to the matching entity, or None if there is none.
+
+    The find requests run on a timer thread. The loader must therefore
+    own its `DataConnection`, or be given a `BatchingDataConnection`,
+    which can be shared between threads.
+    """
+
+    def __init__(self, connection, entity, version, key_field='_id',
+                 projection=None, delay=0.001):
+        """Create a loader for one version of an entity.
+
+        Parameters
+        ----------
+        connection : DataConnection to do the find requests with, not used
+            by other threads unless it is a BatchingDataConnection
+        entity : name of the entity
+        version : version of the entity
+        key_field : top level field to look entities up by, optional
+        projection : dict, must include `key_field`, optional
+        delay : seconds to wait for more keys, optional
+
+        """
+        self.connection = connection
+        self.entity = entity
+        self.version = version
+        self.key_field = key_field
+        self.projection = projection or {'field': '*', 'include': True,
+                                         'recursive': True}
+        self.delay = delay
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def load(self, key):
+        """Find the entity with the given key.
+
+        Parameters
+        ----------
+        key : value of `key_field` to look up
+
+        Returns
+        -------
+        concurrent.futures.Future resolving to the entity or None
+        """
+        future = concurrent.futures.Future()
+        with self._pending_lock:
+            if not self._pending:
+                timer = threading.Timer(self.delay, self._flush)
+                timer.daemon = True
+                timer.start()
+            self._pending.setdefault(key, []).append(future)
+        return future
+
+    def _query(self, keys):
+        return {'field': self.key_field, 'op': '$in', 'values': list(keys)}
+
+    def _resolve(self, pending, response):
+        found = {}
+        for entity in response.get('processed') or []:
+            found[entity.get(self.key_field)] = entity
+        for key, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(found.get(key))
+
+    def _reject(self, pending, error):
+        for futures in pending.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+
+    def _flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        try:
+            with self._flush_lock:
+                response = self.connection.find(
+                    self.entity, self.version, projection=self.projection,
+                    query=self._query(pending))
+        except Exception as e:
+            self._reject(pending, e)
+        else:
+            self._resolve(pending, response)
+
+
+class AsyncFindLoader(FindLoader):
+    """A `FindLoader` for use with an `AsyncDataConnection`.
+
+    Keys passed to `load` during one iteration of the event loop are
+    fetched with a single ``$in`` query.
+    """
+
+    def load(self, key):
+        """Find the entity with the given key.
+
+        Parameters
+        ----------
+        key : value of `key_field` to look up
+
+        Returns
+        -------
+        asyncio.Future resolving to the entity or None
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            loop.call_soon(asyncio.ensure_future, self._flush())
+        self._pending.setdefault(key, []).append(future)
+        return future
+
+    async def _flush(self):
+        pending, self._pending = self._pending, {}
+        try:
+            response = await self.connection.find(
+                self.entity, self.version, projection=self.projection,
+                query=self._query(pending))
+        except Exception as e:
+            self._reject(pending, e)
+        else:
+            self._resolve(pending, response)
@@ -21,7 +21,14 @@ setup(
     name='lightblueclient',
     version='0.1.0',
     packages=find_packages(),
+    python_requires='>=3.7',
     author='Kevin Howell',
     author_email='khowell@redhat.com',
-    url='https://github.com/kahowell/python-lightblueclient'
+    url='https://github.com/kahowell/python-lightblueclient',
+    extras_require={
+        'http2': ['httpx[http2]'],
+        'ijson': ['ijson'],
+        'msgspec': ['msgspec'],
+        'orjson': ['orjson'],
+    }
 )